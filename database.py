@@ -5,11 +5,13 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, WriteConcernError
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -22,14 +24,32 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    # Motor binds to the running event loop lazily on first operation,
+    # so constructing the client at import time is safe for each worker.
+    # Pool is per worker process: sized for concurrent in-flight queries in one
+    # worker, with short timeouts so a saturated pool fails fast instead of queueing.
+    _client = AsyncIOMotorClient(
+        database_url,
+        maxPoolSize=50,
+        minPoolSize=5,
+        serverSelectionTimeoutMS=2000,
+        socketTimeoutMS=5000,
+        waitQueueTimeoutMS=1000,
+        compressors="zstd",
+        # Decode BSON dates as aware UTC datetimes so responses carry an explicit +00:00 offset
+        tz_aware=True,
+    )
     db = _client[database_name]
 
+class DatabaseNotAvailable(RuntimeError):
+    """Raised when DATABASE_URL / DATABASE_NAME are not configured"""
+
+
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+        raise DatabaseNotAvailable("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
@@ -40,16 +60,64 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert many documents with timestamps in a single unordered batch.
+
+    Returns (inserted_ids, errors). A failing document does not stop the rest;
+    each error carries its index in items plus the server code and message.
+    Write concern failures raise WriteConcernError instead.
+    """
+    if db is None:
+        raise DatabaseNotAvailable("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for data in items:
+        data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        data_dict.setdefault('_id', ObjectId())
+        docs.append(data_dict)
+
+    try:
+        await db[collection_name].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Unconfirmed durability fails the whole call, as it does for insert_one
+        wc_errors = e.details.get("writeConcernErrors") or []
+        if wc_errors:
+            raise WriteConcernError(wc_errors[0].get("errmsg"), wc_errors[0].get("code"), wc_errors[0]) from e
+        errors = [
+            {"index": err["index"], "code": err.get("code"), "message": err.get("errmsg")}
+            for err in e.details.get("writeErrors", [])
+        ]
+        failed = {err["index"] for err in errors}
+        inserted_ids = [str(doc['_id']) for i, doc in enumerate(docs) if i not in failed]
+        return inserted_ids, errors
+    return [str(doc['_id']) for doc in docs], []
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None,
+                        sort: list = None, projection: dict = None, hint: list = None):
+    """Get documents from collection, sorted and projected server-side"""
     if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+        raise DatabaseNotAvailable("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if hint:
+        cursor = cursor.hint(hint)
     if limit:
-        cursor = cursor.limit(limit)
+        # Fetch the whole page in a single batch instead of the 101-document default
+        cursor = cursor.limit(limit).batch_size(limit)
     
-    return list(cursor)
+    return await cursor.to_list(length=limit)
+
+async def estimate_document_count(collection_name: str):
+    """Approximate collection size from metadata, without scanning documents"""
+    if db is None:
+        raise DatabaseNotAvailable("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    return await db[collection_name].estimated_document_count()
@@ -1,33 +1,77 @@
+import logging
 import os
-from datetime import datetime
-from typing import Optional, List, Dict
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Literal, Optional, List, Dict, Tuple, Union
 
-from fastapi import FastAPI, HTTPException, Query
+import orjson
+from bson import ObjectId
+from fastapi import Body, FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, TypeAdapter
+from pymongo.errors import PyMongoError
 
-from database import db, create_document, get_documents
+import schemas
 
-app = FastAPI(title="Coinflow API", description="Smart Budget and Expense Tracker")
+from database import (
+    DatabaseNotAvailable,
+    db,
+    create_document,
+    create_documents,
+    get_documents,
+    estimate_document_count,
+)
+
+logger = logging.getLogger(__name__)
+
+# Environment is read once at import rather than on every /test probe
+HAS_DB_URL = bool(os.getenv("DATABASE_URL"))
+HAS_DB_NAME = bool(os.getenv("DATABASE_NAME"))
+
+
+def _orjson_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also encodes BSON ObjectIds"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+app = FastAPI(
+    title="Coinflow API",
+    description="Smart Budget and Expense Tracker",
+    default_response_class=MongoJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=[o.strip() for o in os.getenv("CORS_ORIGIN", "http://localhost:3000").split(",") if o.strip()],
+    allow_credentials=False,
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
 )
 
 
 class ExpenseIn(BaseModel):
     amount: float
     currency: str = "USD"
-    date: Optional[str] = None  # ISO string
+    date: Optional[datetime] = None  # stored as a BSON date
     merchant: Optional[str] = None
     note: Optional[str] = None
     category: Optional[str] = None
     account: Optional[str] = None
-    type: str = "debit"
+    type: Literal["debit", "credit"] = "debit"
 
 
 class BudgetIn(BaseModel):
@@ -43,13 +87,170 @@ class GoalIn(BaseModel):
     deadline: Optional[str] = None  # ISO date
 
 
+# OpenAPI descriptions of the list responses. Nothing validates or serializes through these:
+# handlers return pre-encoded MongoJSONResponses, so FastAPI never applies the response_model.
+# Fields are all optional and loosely typed: the Flames viewer writes these collections directly
+# (e.g. Goal.deadline as a date) and older rows store dates as ISO strings.
+class ExpenseOut(BaseModel):
+    id: str = Field(alias="_id")
+    amount: Optional[float] = None
+    currency: Optional[str] = None
+    date: Optional[Union[datetime, str]] = None
+    merchant: Optional[str] = None
+    note: Optional[str] = None
+    category: Optional[str] = None
+    account: Optional[str] = None
+    type: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class BudgetOut(BaseModel):
+    id: str = Field(alias="_id")
+    category: Optional[str] = None
+    amount: Optional[float] = None
+    month: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class GoalOut(BaseModel):
+    id: str = Field(alias="_id")
+    name: Optional[str] = None
+    target_amount: Optional[float] = None
+    current_amount: Optional[float] = None
+    deadline: Optional[Union[datetime, str]] = None
+    created_at: Optional[datetime] = None
+
+
+class ExpenseList(BaseModel):
+    ok: bool = True
+    items: List[ExpenseOut]
+    next_cursor: Optional[str] = None
+
+
+class BudgetList(BaseModel):
+    ok: bool = True
+    items: List[BudgetOut]
+    next_cursor: Optional[str] = None
+
+
+class GoalList(BaseModel):
+    ok: bool = True
+    items: List[GoalOut]
+    next_cursor: Optional[str] = None
+
+
+# Serializers built once at import; exclude_none keeps unset optional fields out of stored documents
+_EXPENSE_ADAPTER = TypeAdapter(ExpenseIn)
+_BUDGET_ADAPTER = TypeAdapter(BudgetIn)
+_GOAL_ADAPTER = TypeAdapter(GoalIn)
+
+# Failures from the database layer that surface as 500s; anything else is a bug
+DB_ERRORS = (PyMongoError, DatabaseNotAvailable)
+
+# Upper bound on expenses per bulk request, enforced during body validation so oversized
+# lists stop being validated at the cap. The JSON itself is still parsed in full; byte limits
+# belong to the proxy. pymongo already splits insert_many to fit the message size limit.
+MAX_BULK_ITEMS = 1000
+
+# Index key patterns, shared by create_indexes and query hints. Queries hint them only when they
+# filter on the leading field; otherwise the planner is left free to walk _id and stop at the limit.
+# The expense index is partial over debit rows (the hot path); credit listings fall back to _id.
+EXPENSE_DEBIT_INDEX = [("category", 1), ("_id", -1)]
+BUDGET_MONTH_INDEX = [("month", 1), ("_id", -1)]
+# Hinting a missing index is a query error, so hints are only sent once this process created them
+_indexes_ready = False
+
+# Fields returned by list endpoints; internal bookkeeping such as updated_at is not sent
+EXPENSE_PROJECTION = {**{f: 1 for f in ExpenseIn.model_fields}, "created_at": 1}
+BUDGET_PROJECTION = {**{f: 1 for f in BudgetIn.model_fields}, "created_at": 1}
+GOAL_PROJECTION = {**{f: 1 for f in GoalIn.model_fields}, "created_at": 1}
+
+
+def _cursor_filter(after_id: Optional[str]) -> Dict:
+    """Translate a pagination cursor into an _id range filter"""
+    if after_id is None:
+        return {}
+    if not ObjectId.is_valid(after_id):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"_id": {"$lt": ObjectId(after_id)}}
+
+
+def _page(docs: List[Dict], limit: int) -> MongoJSONResponse:
+    """Build a list response with the cursor for the next page, if any.
+
+    Raw Mongo documents go straight to orjson, which converts ObjectIds
+    while encoding. Totals are deliberately not computed here; see the
+    /count endpoints.
+    """
+    next_cursor = str(docs[-1]["_id"]) if len(docs) == limit else None
+    return MongoJSONResponse({"ok": True, "items": docs, "next_cursor": next_cursor})
+
+
+@app.on_event("startup")
+async def create_indexes():
+    global _indexes_ready
+    if db is None:
+        return
+    # An unreachable database or a slow build must not stop the app from serving; /test reports status
+    try:
+        await db.expense.create_index(EXPENSE_DEBIT_INDEX, partialFilterExpression={"type": "debit"})
+        await db.budget.create_index(BUDGET_MONTH_INDEX)
+        await db.goal.create_index([("deadline", 1)])
+        _indexes_ready = True
+    except PyMongoError as e:
+        logger.warning("Index creation failed, continuing without index hints: %s", e)
+
+
+@lru_cache(maxsize=None)
+def _schema_json() -> bytes:
+    """JSON schemas for every collection model in schemas.py, encoded once"""
+    models = {
+        name.lower(): model.model_json_schema()
+        for name, model in vars(schemas).items()
+        if isinstance(model, type) and issubclass(model, BaseModel) and model is not BaseModel
+    }
+    return orjson.dumps(models)
+
+
+# Health checks hit this constantly; the same response instance is returned every time
+_ROOT = ORJSONResponse({"message": "Coinflow Backend is running"})
+
+
 @app.get("/")
-def read_root():
-    return {"message": "Coinflow Backend is running"}
+async def read_root():
+    return _ROOT
+
+
+@app.get("/schema")
+async def get_schema():
+    return Response(content=_schema_json(), media_type="application/json")
+
+
+# list_collection_names() is an admin round-trip; /test is often used as a probe
+COLLECTIONS_TTL_SECONDS = 30
+# Past this age a failed refresh raises, so an outage shows up in /test instead of being masked
+COLLECTIONS_MAX_STALE_SECONDS = 4 * COLLECTIONS_TTL_SECONDS
+_collections_cache: Optional[Tuple[List[str], float]] = None
+
+
+async def _collection_names() -> List[str]:
+    """Collection names cached for COLLECTIONS_TTL_SECONDS, served stale on error for a bounded time"""
+    global _collections_cache
+    now = time.monotonic()
+    if _collections_cache is not None and now - _collections_cache[1] < COLLECTIONS_TTL_SECONDS:
+        return _collections_cache[0]
+    try:
+        names = await db.list_collection_names()
+    except Exception:
+        if _collections_cache is not None and now - _collections_cache[1] < COLLECTIONS_MAX_STALE_SECONDS:
+            return _collections_cache[0]
+        raise
+    _collections_cache = (names, now)
+    return names
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -66,7 +267,7 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await _collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -76,91 +277,168 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
-    return response
+    response["database_url"] = "✅ Set" if HAS_DB_URL else "❌ Not Set"
+    response["database_name"] = "✅ Set" if HAS_DB_NAME else "❌ Not Set"
+    return Response(content=orjson.dumps(response), media_type="application/json")
 
 
 # -----------------------------
 # Expense Endpoints
 # -----------------------------
 @app.post("/api/expenses")
-def add_expense(expense: ExpenseIn):
+async def add_expense(expense: ExpenseIn):
+    data = _EXPENSE_ADAPTER.dump_python(expense, exclude_none=True)
+    data["date"] = data.get("date") or datetime.now(timezone.utc)
     try:
-        data = expense.model_dump()
-        data["date"] = data.get("date") or datetime.utcnow().isoformat()
-        inserted_id = create_document("expense", data)
-        return {"ok": True, "id": inserted_id}
-    except Exception as e:
+        inserted_id = await create_document("expense", data)
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "id": inserted_id}
 
 
-@app.get("/api/expenses")
-def list_expenses(category: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+@app.post("/api/expenses/bulk")
+async def add_expenses(
+    response: Response,
+    items: List[ExpenseIn] = Body(..., min_length=1, max_length=MAX_BULK_ITEMS),
+):
+    now = datetime.now(timezone.utc)
+    docs = []
+    for item in items:
+        data = _EXPENSE_ADAPTER.dump_python(item, exclude_none=True)
+        data["date"] = data.get("date") or now
+        docs.append(data)
     try:
-        filter_query: Dict = {"type": "debit"}
-        if category:
-            filter_query["category"] = category
-        docs = get_documents("expense", filter_query, limit=limit)
-        for d in docs:
-            d["_id"] = str(d.get("_id"))
-        return {"ok": True, "items": docs}
-    except Exception as e:
+        inserted_ids, errors = await create_documents("expense", docs)
+    except DB_ERRORS as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if errors:
+        # Partial success: report what was stored so a retry only resends the failed indexes
+        response.status_code = 207
+        return {"ok": False, "ids": inserted_ids, "inserted": len(inserted_ids), "errors": errors}
+    return {"ok": True, "ids": inserted_ids, "inserted": len(inserted_ids)}
+
+
+@app.get("/api/expenses", response_model=ExpenseList)
+async def list_expenses(
+    category: Optional[str] = None,
+    expense_type: Literal["debit", "credit"] = Query("debit", alias="type"),
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[str] = Query(None),
+):
+    filter_query: Dict = _cursor_filter(after_id)
+    # type stays in the filter even for debits: the partial index is only eligible when the query implies it
+    filter_query["type"] = expense_type
+    if category:
+        filter_query["category"] = category
+    try:
+        docs = await get_documents(
+            "expense", filter_query, limit=limit,
+            sort=[("_id", -1)], projection=EXPENSE_PROJECTION,
+            hint=EXPENSE_DEBIT_INDEX if _indexes_ready and expense_type == "debit" and category else None,
+        )
+    except DB_ERRORS as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _page(docs, limit)
+
+
+@app.get("/api/expenses/count")
+async def count_expenses():
+    try:
+        count = await estimate_document_count("expense")
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "count": count}
 
 
 # -----------------------------
 # Budget Endpoints
 # -----------------------------
 @app.post("/api/budgets")
-def add_budget(budget: BudgetIn):
+async def add_budget(budget: BudgetIn):
+    data = _BUDGET_ADAPTER.dump_python(budget, exclude_none=True)
     try:
-        data = budget.model_dump()
-        inserted_id = create_document("budget", data)
-        return {"ok": True, "id": inserted_id}
-    except Exception as e:
+        inserted_id = await create_document("budget", data)
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "id": inserted_id}
 
 
-@app.get("/api/budgets")
-def list_budgets(month: Optional[str] = None, limit: int = Query(50, ge=1, le=200)):
+@app.get("/api/budgets", response_model=BudgetList)
+async def list_budgets(
+    month: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    after_id: Optional[str] = Query(None),
+):
+    filter_query: Dict = _cursor_filter(after_id)
+    if month:
+        filter_query["month"] = month
     try:
-        filter_query: Dict = {}
-        if month:
-            filter_query["month"] = month
-        docs = get_documents("budget", filter_query, limit=limit)
-        for d in docs:
-            d["_id"] = str(d.get("_id"))
-        return {"ok": True, "items": docs}
-    except Exception as e:
+        docs = await get_documents(
+            "budget", filter_query, limit=limit,
+            sort=[("_id", -1)], projection=BUDGET_PROJECTION,
+            hint=BUDGET_MONTH_INDEX if _indexes_ready and month else None,
+        )
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return _page(docs, limit)
+
+
+@app.get("/api/budgets/count")
+async def count_budgets():
+    try:
+        count = await estimate_document_count("budget")
+    except DB_ERRORS as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "count": count}
 
 
 # -----------------------------
 # Goals Endpoints
 # -----------------------------
 @app.post("/api/goals")
-def add_goal(goal: GoalIn):
+async def add_goal(goal: GoalIn):
+    data = _GOAL_ADAPTER.dump_python(goal, exclude_none=True)
     try:
-        data = goal.model_dump()
-        inserted_id = create_document("goal", data)
-        return {"ok": True, "id": inserted_id}
-    except Exception as e:
+        inserted_id = await create_document("goal", data)
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "id": inserted_id}
 
 
-@app.get("/api/goals")
-def list_goals(limit: int = Query(50, ge=1, le=200)):
+@app.get("/api/goals", response_model=GoalList)
+async def list_goals(limit: int = Query(50, ge=1, le=200), after_id: Optional[str] = Query(None)):
+    filter_query: Dict = _cursor_filter(after_id)
     try:
-        docs = get_documents("goal", {}, limit=limit)
-        for d in docs:
-            d["_id"] = str(d.get("_id"))
-        return {"ok": True, "items": docs}
-    except Exception as e:
+        docs = await get_documents(
+            "goal", filter_query, limit=limit,
+            sort=[("_id", -1)], projection=GOAL_PROJECTION,
+        )
+    except DB_ERRORS as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _page(docs, limit)
+
+
+@app.get("/api/goals/count")
+async def count_goals():
+    try:
+        count = await estimate_document_count("goal")
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": True, "count": count}
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False,
+        server_header=False,
+    )
@@ -13,7 +13,7 @@ Model name is converted to lowercase for the collection name:
 
 from pydantic import BaseModel, Field
 from typing import Optional, Literal
-from datetime import date
+from datetime import date as date_type
 
 # Example schemas (you can keep or remove if not needed):
 
@@ -49,7 +49,7 @@ class Expense(BaseModel):
     """
     amount: float = Field(..., gt=0, description="Amount spent")
     currency: str = Field("USD", min_length=3, max_length=3, description="ISO currency code")
-    date: Optional[date] = Field(None, description="Date of expense")
+    date: Optional[date_type] = Field(None, description="Date of expense")
     merchant: Optional[str] = Field(None, description="Merchant or payee name")
     note: Optional[str] = Field(None, description="Optional note")
     category: Optional[str] = Field(None, description="Auto-assigned or user-selected category")
@@ -71,7 +71,7 @@ class Goal(BaseModel):
     name: str = Field(..., description="Goal name")
     target_amount: float = Field(..., gt=0, description="Target savings amount")
     current_amount: float = Field(0, ge=0, description="Current saved amount")
-    deadline: Optional[date] = Field(None, description="Deadline for the goal")
+    deadline: Optional[date_type] = Field(None, description="Deadline for the goal")
 
 # Note: The Flames database viewer will automatically:
 # 1. Read these schemas from GET /schema endpoint
@@ -15,5 +15,8 @@ mkdir -p logs
 echo "Installing dependencies..."
 pip install -r requirements.txt
 echo "Starting FastAPI server..."
-nohup uvicorn main:app --host 0.0.0.0 --port 8000 --reload > logs/server.log 2>&1 
+WORKERS=${WEB_CONCURRENCY:-$(( $(nproc) * 2 + 1 ))}
+nohup uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000} \
+  --workers $WORKERS --loop uvloop --http httptools \
+  --log-level warning --no-access-log --no-server-header > logs/server.log 2>&1 
 echo "Server started in background"